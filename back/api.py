@@ -30,6 +30,7 @@ async def lifespan(app: FastAPI):
     app.state.report_generator = report_generator
     yield
     logger.info("Shutting down the model...")
+    report_generator.cache.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -14,6 +14,13 @@ class Config:
             raise ValueError("HF_TOKEN environment variable not set.")
         self.model_name = "microsoft/maira-2"
         self.results_dir = "results"
+        self.cache_backend = getenv("CACHE_BACKEND", "disk")
+        self.cache_url = getenv("CACHE_URL", "redis://localhost:6379/0")
+        self.cache_sqlite_path = getenv("CACHE_SQLITE_PATH")
+        self.cache_lease_ttl = float(getenv("CACHE_LEASE_TTL", 300))
+        self.cache_lease_poll_interval = float(
+            getenv("CACHE_LEASE_POLL_INTERVAL", 1)
+        )
         self.num_threads = self.configure_threads()
 
     @staticmethod
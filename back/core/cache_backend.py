@@ -0,0 +1,436 @@
+import fcntl
+import json
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from os import path, makedirs, replace, remove, getpid
+from typing import Iterable, Optional
+from urllib.parse import urlparse, unquote
+
+
+class CacheBackend(ABC):
+    """
+    Base class for report result caches.
+
+    Values are JSON-serialised and zlib-compressed before they reach the
+    storage layer. Subclasses only deal with raw bytes and leases.
+    """
+
+    def __init__(self, lease_ttl: float = 300.0, compress_level: int = 6):
+        self.lease_ttl = lease_ttl
+        self.compress_level = compress_level
+
+    def encode(self, value: dict) -> bytes:
+        """Serialises and compresses a result."""
+        return zlib.compress(json.dumps(value).encode(), self.compress_level)
+
+    @staticmethod
+    def decode(data: bytes) -> dict:
+        """
+        Decompresses and deserialises a result.
+
+        Uncompressed JSON written by older versions is accepted as is.
+        """
+        try:
+            data = zlib.decompress(data)
+        except zlib.error:
+            pass
+        return json.loads(data)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached result for a key, or None on a miss."""
+        data = self.get_raw(key)
+        return None if data is None else self.decode(data)
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        """
+        Fetches several results in one batch.
+
+        Returns:
+            dict: Mapping of key to result, containing only the hits.
+        """
+        keys = list(dict.fromkeys(keys))
+        results = {}
+        for key, data in zip(keys, self.get_many_raw(keys)):
+            if data is not None:
+                results[key] = self.decode(data)
+        return results
+
+    def set(self, key: str, value: dict) -> None:
+        """Stores a result."""
+        self.set_raw(key, self.encode(value))
+
+    def get_many_raw(self, keys: list) -> list:
+        """Returns raw values for each key, in order. Override to batch."""
+        return [self.get_raw(key) for key in keys]
+
+    @abstractmethod
+    def get_raw(self, key: str) -> Optional[bytes]:
+        """Returns the stored bytes for a key, or None."""
+
+    @abstractmethod
+    def set_raw(self, key: str, data: bytes) -> None:
+        """Stores bytes under a key."""
+
+    @abstractmethod
+    def acquire_lease(self, key: str, owner: str) -> bool:
+        """
+        Tries to take the computation lease for a key.
+
+        The lease expires on its own after `lease_ttl` seconds, so a node
+        that dies mid-computation does not block the key forever.
+
+        Returns:
+            bool: True if the lease was granted to `owner`.
+        """
+
+    @abstractmethod
+    def release_lease(self, key: str, owner: str) -> None:
+        """Releases the lease for a key if it is still held by `owner`."""
+
+    def close(self) -> None:
+        """Releases any resources held by the backend."""
+
+
+class DiskCache(CacheBackend):
+    """
+    Stores results as compressed files in a local or shared directory.
+
+    Leases are guarded by an `flock` on a lock file in the directory, which
+    serialises the processes of a single host. Use the redis or sqlite
+    backend when several nodes must not compute the same report.
+    """
+
+    extension = ".json.z"
+    legacy_extension = ".txt"
+    lock_filename = ".lease.lock"
+
+    def __init__(self, results_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self.results_dir = results_dir
+
+    def _filename(self, key: str, extension: str) -> str:
+        return path.join(self.results_dir, f"{key}{extension}")
+
+    def get_raw(self, key: str) -> Optional[bytes]:
+        for extension in (self.extension, self.legacy_extension):
+            filename = self._filename(key, extension)
+            if path.exists(filename):
+                with open(filename, "rb") as file:
+                    return file.read()
+        return None
+
+    def set_raw(self, key: str, data: bytes) -> None:
+        makedirs(self.results_dir, exist_ok=True)
+        filename = self._filename(key, self.extension)
+        tmp_filename = f"{filename}.{getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "wb") as file:
+            file.write(data)
+        replace(tmp_filename, filename)
+
+    @contextmanager
+    def _lease_lock(self):
+        """Holds an exclusive lock while lease files are inspected or changed."""
+        makedirs(self.results_dir, exist_ok=True)
+        with open(path.join(self.results_dir, self.lock_filename), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def acquire_lease(self, key: str, owner: str) -> bool:
+        filename = self._filename(key, ".lease")
+        with self._lease_lock():
+            try:
+                if time.time() - path.getmtime(filename) <= self.lease_ttl:
+                    return False
+            except FileNotFoundError:
+                pass
+            with open(filename, "w") as file:
+                file.write(owner)
+            return True
+
+    def release_lease(self, key: str, owner: str) -> None:
+        filename = self._filename(key, ".lease")
+        with self._lease_lock():
+            try:
+                with open(filename, "r") as file:
+                    if file.read() != owner:
+                        return
+                remove(filename)
+            except FileNotFoundError:
+                pass
+
+
+class RedisError(Exception):
+    """Raised when a Redis-protocol server replies with an error."""
+
+
+class RedisCache(CacheBackend):
+    """
+    Stores results in any server speaking the Redis protocol (RESP).
+
+    A minimal client is used so that no extra dependency is required.
+    """
+
+    # Deletes the lease only if it is still held by the caller, atomically.
+    release_script = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        key_prefix: str = "maira:",
+        timeout: float = 5.0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.key_prefix}result:{key}"
+
+    def _lease_key(self, key: str) -> str:
+        return f"{self.key_prefix}lease:{key}"
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._send_command("AUTH", self.password)
+        if self.db:
+            self._send_command("SELECT", self.db)
+
+    def _send_command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode()
+        if prefix == b"-":
+            raise RedisError(payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply from cache server: {line!r}")
+
+    def execute(self, *args):
+        """Sends a command, reconnecting once if the connection dropped."""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send_command(*args)
+                except (ConnectionError, OSError):
+                    self._disconnect()
+                    if attempt:
+                        raise
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def get_raw(self, key: str) -> Optional[bytes]:
+        return self.execute("GET", self._result_key(key))
+
+    def get_many_raw(self, keys: list) -> list:
+        if not keys:
+            return []
+        return self.execute("MGET", *(self._result_key(key) for key in keys))
+
+    def set_raw(self, key: str, data: bytes) -> None:
+        self.execute("SET", self._result_key(key), data)
+
+    def acquire_lease(self, key: str, owner: str) -> bool:
+        ttl_ms = int(self.lease_ttl * 1000)
+        reply = self.execute("SET", self._lease_key(key), owner, "NX", "PX", ttl_ms)
+        return reply == "OK"
+
+    def release_lease(self, key: str, owner: str) -> None:
+        self.execute("EVAL", self.release_script, 1, self._lease_key(key), owner)
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Stores results in a SQLite file that several nodes can share.
+
+    The rollback journal is used because WAL mode relies on shared memory
+    and does not work when the file lives on a network filesystem.
+    """
+
+    # SQLite limits the number of bound parameters per statement.
+    batch_size = 500
+
+    def __init__(self, db_path: str, timeout: float = 30.0, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.timeout = timeout
+        directory = path.dirname(db_path)
+        if directory:
+            makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=self.timeout)
+
+    def get_raw(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return None if row is None else bytes(row[0])
+
+    def get_many_raw(self, keys: list) -> list:
+        found = {}
+        conn = self._connect()
+        try:
+            for start in range(0, len(keys), self.batch_size):
+                batch = keys[start:start + self.batch_size]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({placeholders})",
+                    batch,
+                )
+                found.update((key, bytes(value)) for key, value in rows)
+        finally:
+            conn.close()
+        return [found.get(key) for key in keys]
+
+    def set_raw(self, key: str, data: bytes) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, data, time.time()),
+                )
+        finally:
+            conn.close()
+
+    def acquire_lease(self, key: str, owner: str) -> bool:
+        now = time.time()
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, owner, now + self.lease_ttl),
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount == 1
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release_lease(self, key: str, owner: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)
+                )
+        finally:
+            conn.close()
+
+
+def create_cache_backend(
+    backend: str,
+    results_dir: str = "results",
+    url: Optional[str] = None,
+    sqlite_path: Optional[str] = None,
+    lease_ttl: float = 300.0,
+) -> CacheBackend:
+    """
+    Builds the cache backend selected by name.
+
+    Args:
+        backend (str): One of "disk", "redis" or "sqlite".
+        results_dir (str): Directory used by the disk backend.
+        url (Optional[str]): Server URL used by the redis backend.
+        sqlite_path (Optional[str]): Database file used by the sqlite backend.
+        lease_ttl (float): Seconds before a computation lease expires.
+
+    Returns:
+        CacheBackend: The configured backend.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    backend = backend.lower()
+    if backend == "disk":
+        return DiskCache(results_dir, lease_ttl=lease_ttl)
+    if backend == "redis":
+        return RedisCache(url or "redis://localhost:6379/0", lease_ttl=lease_ttl)
+    if backend == "sqlite":
+        db_path = sqlite_path or path.join(results_dir, "cache.sqlite3")
+        return SQLiteCache(db_path, lease_ttl=lease_ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -1,12 +1,12 @@
-import json
 import hashlib
 import time
 import asyncio
 import logging
-from os import path, makedirs
-from typing import Optional
+from typing import Iterable, Optional
+from uuid import uuid4
 from fastapi import HTTPException
 from config import config
+from core.cache_backend import CacheBackend, create_cache_backend
 from core.image_utils import ImageUtils
 
 logger = logging.getLogger(__name__)
@@ -15,9 +15,21 @@ logger = logging.getLogger(__name__)
 class ReportGenerator:
     """Generates chest X-ray reports using the MAIRA-2 model."""
 
-    def __init__(self, model_loader: object, results_dir: str = config.results_dir):
+    def __init__(
+        self,
+        model_loader: object,
+        results_dir: str = config.results_dir,
+        cache: Optional[CacheBackend] = None,
+    ):
         self.model_loader = model_loader
         self.results_dir = results_dir
+        self.cache = cache or create_cache_backend(
+            config.cache_backend,
+            results_dir=results_dir,
+            url=config.cache_url,
+            sqlite_path=config.cache_sqlite_path,
+            lease_ttl=config.cache_lease_ttl,
+        )
         self.device = None
         self.model = None
         self.processor = None
@@ -57,7 +69,7 @@ class ReportGenerator:
 
     def load_result_from_file(self, hash_value: str) -> Optional[dict]:
         """
-        Loads a cached result from a file, if it exists.
+        Loads a cached result from the cache backend, if it exists.
 
         Args:
             hash_value (str): The hash of the input parameters.
@@ -70,25 +82,41 @@ class ReportGenerator:
             f"{step}: ReportGenerator.load_result_from_file - Loading cached result",
             end=" ",
         )
-        filename = path.join(self.results_dir, f"{hash_value}.txt")
-        if path.exists(filename):
-            try:
-                with open(filename, "r") as file:
-                    result = json.load(file)
-                    print("- Cache hit")
-                    return result
-            except Exception as e:
-                error_msg = f"{step}: Error loading result from file - {e}"
-                print(f"\n{error_msg}")
-                logger.error(error_msg)
-                print(f"{step}: - Cache miss (error)")
-                return None
+        try:
+            result = self.cache.get(hash_value)
+        except Exception as e:
+            error_msg = f"{step}: Error loading result from cache - {e}"
+            print(f"\n{error_msg}")
+            logger.error(error_msg)
+            print(f"{step}: - Cache miss (error)")
+            return None
+        if result is not None:
+            print("- Cache hit")
+            return result
         print("- Cache miss")
         return None
 
+    async def load_results(self, hash_values: Iterable[str]) -> dict:
+        """
+        Loads several cached results in a single batch, for bulk runs.
+
+        Args:
+            hash_values (Iterable[str]): Hashes of the input parameters.
+
+        Returns:
+            dict: Mapping of hash to cached result, containing only the hits.
+        """
+        try:
+            return await asyncio.to_thread(self.cache.get_many, list(hash_values))
+        except Exception as e:
+            error_msg = f"Error loading results from cache - {e}"
+            print(error_msg)
+            logger.error(error_msg)
+            return {}
+
     def save_result_to_file(self, hash_value: str, result: dict) -> None:
         """
-        Saves a result to a file for caching.
+        Saves a result to the cache backend.
 
         Args:
             hash_value (str): The hash of the input parameters.
@@ -96,20 +124,78 @@ class ReportGenerator:
         """
         step = "Step 13/15"
         print(
-            f"{step}: ReportGenerator.save_result_to_file - Saving result to file",
+            f"{step}: ReportGenerator.save_result_to_file - Saving result to cache",
             end=" ",
         )
-        makedirs(self.results_dir, exist_ok=True)
-        filename = path.join(self.results_dir, f"{hash_value}.txt")
         try:
-            with open(filename, "w") as file:
-                json.dump(result, file)
+            self.cache.set(hash_value, result)
             print("- Result saved")
         except Exception as e:
-            error_msg = f"{step}: Error saving result to file - {e}"
+            error_msg = f"{step}: Error saving result to cache - {e}"
             print(f"\n{error_msg}")
             logger.error(error_msg)
 
+    async def acquire_lease(self, hash_value: str) -> tuple:
+        """
+        Takes the computation lease for an input so that only one node
+        generates a given report at a time.
+
+        While another node holds the lease, the cache is polled until its
+        result appears or the lease expires.
+
+        Args:
+            hash_value (str): The hash of the input parameters.
+
+        Returns:
+            tuple: (cached result or None, lease owner or None). The owner is
+            None when no lease is held and the report should be computed
+            without one.
+        """
+        step = "Step 8/15"
+        owner = uuid4().hex
+        deadline = time.monotonic() + self.cache.lease_ttl
+        while True:
+            try:
+                acquired = await asyncio.to_thread(
+                    self.cache.acquire_lease, hash_value, owner
+                )
+            except Exception as e:
+                error_msg = f"{step}: Error acquiring cache lease - {e}"
+                print(error_msg)
+                logger.error(error_msg)
+                return None, None
+            if acquired:
+                print(f"{step}: ReportGenerator.acquire_lease - Lease acquired")
+                result = await asyncio.to_thread(
+                    self.load_result_from_file, hash_value
+                )
+                return result, owner
+            if time.monotonic() >= deadline:
+                logger.warning("Cache lease wait timed out, computing anyway.")
+                return None, None
+            print(f"{step}: ReportGenerator.acquire_lease - Waiting for other node")
+            await asyncio.sleep(config.cache_lease_poll_interval)
+            result = await asyncio.to_thread(self.load_result_from_file, hash_value)
+            if result:
+                return result, None
+
+    def release_lease(self, hash_value: str, owner: Optional[str]) -> None:
+        """
+        Releases a computation lease taken by `acquire_lease`.
+
+        Args:
+            hash_value (str): The hash of the input parameters.
+            owner (Optional[str]): The lease owner, or None if no lease is held.
+        """
+        if owner is None:
+            return
+        try:
+            self.cache.release_lease(hash_value, owner)
+        except Exception as e:
+            error_msg = f"Error releasing cache lease - {e}"
+            print(error_msg)
+            logger.error(error_msg)
+
     async def generate_report(
         self,
         frontal_url: str,
@@ -140,7 +226,9 @@ class ReportGenerator:
         input_hash = self.create_hash(
             frontal_url, lateral_url, indication, comparison, technique
         )
-        cached_result = self.load_result_from_file(input_hash)
+        cached_result = await asyncio.to_thread(
+            self.load_result_from_file, input_hash
+        )
 
         if cached_result:
             logger.info("Result found in cache.")
@@ -151,6 +239,12 @@ class ReportGenerator:
             )
             return cached_result
 
+        cached_result, lease_owner = await self.acquire_lease(input_hash)
+        if cached_result:
+            await asyncio.to_thread(self.release_lease, input_hash, lease_owner)
+            logger.info("Result computed by another node found in cache.")
+            return cached_result
+
         try:
             print("Step 10/15: ReportGenerator.generate_report - Downloading images")
             frontal_image, lateral_image = await asyncio.gather(
@@ -205,7 +299,7 @@ class ReportGenerator:
                 "report": f"{prediction} Time processed: {processing_time} seconds",
             }
 
-            self.save_result_to_file(input_hash, result)
+            await asyncio.to_thread(self.save_result_to_file, input_hash, result)
             print(
                 "Step 14/15: ReportGenerator.generate_report - Returning generated result"
             )
@@ -219,6 +313,7 @@ class ReportGenerator:
                 status_code=500, detail="Error generating report: {}".format(str(e))
             )
         finally:
+            await asyncio.to_thread(self.release_lease, input_hash, lease_owner)
             print(
                 "Step 15/15: ReportGenerator.generate_report - Finished generating report"
             )
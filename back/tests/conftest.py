@@ -0,0 +1,95 @@
+import socketserver
+import threading
+import time
+from os import environ
+import pytest
+from core.cache_backend import RedisCache
+
+environ.setdefault("HF_TOKEN", "test-token")
+
+
+class RespStandInHandler(socketserver.StreamRequestHandler):
+    """Speaks enough of the Redis protocol to exercise RedisCache."""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def write_bulk(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        else:
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            with self.server.lock:
+                self.server.expire()
+                if command == b"GET":
+                    self.write_bulk(store.get(args[1]))
+                elif command == b"MGET":
+                    self.wfile.write(b"*%d\r\n" % (len(args) - 1))
+                    for key in args[1:]:
+                        self.write_bulk(store.get(key))
+                elif command == b"SET":
+                    options = [arg.upper() for arg in args[3:]]
+                    if b"NX" in options and args[1] in store:
+                        self.write_bulk(None)
+                        continue
+                    store[args[1]] = args[2]
+                    if b"PX" in options:
+                        ttl_ms = int(options[options.index(b"PX") + 1])
+                        self.server.expiry[args[1]] = time.time() + ttl_ms / 1000
+                    self.wfile.write(b"+OK\r\n")
+                elif command == b"EVAL" and args[1] == RedisCache.release_script.encode():
+                    key, owner = args[3], args[4]
+                    released = store.get(key) == owner
+                    if released:
+                        del store[key]
+                        self.server.expiry.pop(key, None)
+                    self.wfile.write(b":%d\r\n" % released)
+                elif command == b"DEL":
+                    removed = sum(store.pop(key, None) is not None for key in args[1:])
+                    self.wfile.write(b":%d\r\n" % removed)
+                else:
+                    self.wfile.write(b"-ERR unknown command\r\n")
+
+
+class RespStandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespStandInHandler)
+        self.store = {}
+        self.expiry = {}
+        self.lock = threading.Lock()
+
+    def expire(self):
+        now = time.time()
+        for key, deadline in list(self.expiry.items()):
+            if deadline <= now:
+                self.store.pop(key, None)
+                del self.expiry[key]
+
+
+@pytest.fixture
+def redis_url():
+    server = RespStandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield f"redis://{host}:{port}/0"
+    server.shutdown()
+    server.server_close()
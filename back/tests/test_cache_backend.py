@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+import zlib
+import pytest
+from core.cache_backend import (
+    DiskCache,
+    RedisCache,
+    SQLiteCache,
+    create_cache_backend,
+)
+
+RESULT = {
+    "frontal_image": "frontal_base64",
+    "lateral_image": "lateral_base64",
+    "report": "Test report",
+}
+
+
+@pytest.fixture(params=["disk", "redis", "sqlite"])
+def cache(request, tmp_path, redis_url):
+    backend = create_cache_backend(
+        request.param,
+        results_dir=str(tmp_path),
+        url=redis_url,
+        sqlite_path=str(tmp_path / "cache.sqlite3"),
+        lease_ttl=0.2,
+    )
+    yield backend
+    backend.close()
+
+
+def test_get_missing_returns_none(cache):
+    """A miss returns None."""
+    assert cache.get("missing") is None
+
+
+def test_set_and_get_roundtrip(cache):
+    """Stored values come back unchanged."""
+    cache.set("abc", RESULT)
+    assert cache.get("abc") == RESULT
+
+
+def test_values_are_compressed(cache):
+    """Values reach the storage layer compressed."""
+    cache.set("abc", RESULT)
+    raw = cache.get_raw("abc")
+    plain = json.dumps(RESULT).encode()
+    assert raw != plain
+    assert zlib.decompress(raw) == plain
+
+
+def test_get_many_returns_only_hits(cache):
+    """Batched multi-get skips misses."""
+    cache.set("a", {"report": "a"})
+    cache.set("b", {"report": "b"})
+    assert cache.get_many(["a", "missing", "b"]) == {
+        "a": {"report": "a"},
+        "b": {"report": "b"},
+    }
+    assert cache.get_many([]) == {}
+
+
+def test_lease_is_exclusive(cache):
+    """Only one owner holds the lease until it is released."""
+    assert cache.acquire_lease("abc", "node-1")
+    assert not cache.acquire_lease("abc", "node-2")
+    cache.release_lease("abc", "node-2")
+    assert not cache.acquire_lease("abc", "node-2")
+    cache.release_lease("abc", "node-1")
+    assert cache.acquire_lease("abc", "node-2")
+
+
+def test_release_after_expiry_keeps_new_owner_lease(cache):
+    """A stale owner releasing late does not drop the new owner's lease."""
+    assert cache.acquire_lease("abc", "node-1")
+    time.sleep(0.3)
+    assert cache.acquire_lease("abc", "node-2")
+    cache.release_lease("abc", "node-1")
+    assert not cache.acquire_lease("abc", "node-3")
+
+
+def test_lease_expires(cache):
+    """An abandoned lease can be taken over after its TTL."""
+    assert cache.acquire_lease("abc", "node-1")
+    time.sleep(0.3)
+    assert cache.acquire_lease("abc", "node-2")
+
+
+def test_redis_backends_share_results(redis_url):
+    """Two nodes pointed at the same server see each other's results."""
+    node_a = RedisCache(redis_url)
+    node_b = RedisCache(redis_url)
+    node_a.set("abc", RESULT)
+    assert node_b.get("abc") == RESULT
+    assert node_b.get_many(["abc", "missing"]) == {"abc": RESULT}
+    node_a.close()
+    node_b.close()
+
+
+def test_sqlite_backends_share_results(tmp_path):
+    """Two nodes opening the same file see each other's results."""
+    db_path = str(tmp_path / "shared.sqlite3")
+    node_a = SQLiteCache(db_path)
+    node_b = SQLiteCache(db_path)
+    node_a.set("abc", RESULT)
+    assert node_b.get("abc") == RESULT
+    assert node_a.acquire_lease("abc", "node-a")
+    assert not node_b.acquire_lease("abc", "node-b")
+
+
+def test_sqlite_uses_rollback_journal(tmp_path):
+    """WAL is not used, so the file stays safe on network filesystems."""
+    cache = SQLiteCache(str(tmp_path / "shared.sqlite3"))
+    conn = cache._connect()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    finally:
+        conn.close()
+
+
+def test_disk_expired_lease_takeover_has_single_winner(tmp_path):
+    """Concurrent takeovers of an expired lease grant it only once."""
+    cache = DiskCache(str(tmp_path), lease_ttl=0.1)
+    assert cache.acquire_lease("abc", "stale-node")
+    time.sleep(0.2)
+    barrier = threading.Barrier(8)
+    winners = []
+
+    def take_over(owner):
+        barrier.wait()
+        if cache.acquire_lease("abc", owner):
+            winners.append(owner)
+
+    threads = [
+        threading.Thread(target=take_over, args=(f"node-{i}",)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(winners) == 1
+
+
+def test_disk_reads_legacy_uncompressed_results(tmp_path):
+    """Plain JSON files written by older versions are still served."""
+    (tmp_path / "abc.txt").write_text('{"report": "Legacy report"}')
+    cache = DiskCache(str(tmp_path))
+    assert cache.get("abc") == {"report": "Legacy report"}
+
+
+def test_unknown_backend_raises():
+    """An unknown backend name is rejected."""
+    with pytest.raises(ValueError):
+        create_cache_backend("memcached")
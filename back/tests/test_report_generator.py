@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+from core.cache_backend import RedisCache
+from core.report_generator import ReportGenerator, config
+
+INPUTS = ("frontal.png", "lateral.png", "Cough", "None", "Digital")
+OTHER_NODE_RESULT = {
+    "frontal_image": "frontal_base64",
+    "lateral_image": "lateral_base64",
+    "report": "Report from another node",
+}
+
+
+@pytest.fixture(autouse=True)
+def fast_lease_polling(monkeypatch):
+    monkeypatch.setattr(config, "cache_lease_poll_interval", 0.05)
+
+
+@pytest.fixture(autouse=True)
+def mock_image_utils():
+    with patch("core.report_generator.ImageUtils") as image_utils:
+        image_utils.download_image_async = AsyncMock(return_value=MagicMock())
+        image_utils.image_to_base64 = MagicMock(return_value="image_base64")
+        yield image_utils
+
+
+@pytest.fixture
+def cache(redis_url):
+    backend = RedisCache(redis_url, lease_ttl=5)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def other_node(redis_url):
+    backend = RedisCache(redis_url, lease_ttl=60)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def generator(cache):
+    model_loader = MagicMock()
+    processor = model_loader.get_processor.return_value
+    processor.format_and_preprocess_reporting_input.return_value = {
+        "input_ids": MagicMock()
+    }
+    processor.tokenizer.decode.return_value = " Generated report"
+    report_generator = ReportGenerator(model_loader, cache=cache)
+    report_generator.setup()
+    return report_generator
+
+
+def test_generate_report_computes_saves_and_releases_lease(generator, cache):
+    """A miss computes the report, caches it and frees the lease."""
+    result = asyncio.run(generator.generate_report(*INPUTS))
+    input_hash = generator.create_hash(*INPUTS)
+    assert result["report"].startswith("Generated report")
+    assert cache.get(input_hash) == result
+    assert cache.acquire_lease(input_hash, "next-node")
+
+
+def test_generate_report_waits_for_other_node(generator, other_node):
+    """A node finding the lease taken returns the holder's result."""
+    input_hash = generator.create_hash(*INPUTS)
+    assert other_node.acquire_lease(input_hash, "other-node")
+
+    async def run():
+        task = asyncio.create_task(generator.generate_report(*INPUTS))
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        other_node.set(input_hash, OTHER_NODE_RESULT)
+        other_node.release_lease(input_hash, "other-node")
+        return await task
+
+    assert asyncio.run(run()) == OTHER_NODE_RESULT
+    generator.model.generate.assert_not_called()
+
+
+def test_generate_report_computes_after_lease_wait_times_out(
+    generator, cache, other_node
+):
+    """A lease that outlives the wait does not block the report forever."""
+    cache.lease_ttl = 0.2
+    input_hash = generator.create_hash(*INPUTS)
+    assert other_node.acquire_lease(input_hash, "other-node")
+
+    result = asyncio.run(generator.generate_report(*INPUTS))
+    assert result["report"].startswith("Generated report")
+    generator.model.generate.assert_called_once()
+    assert cache.get(input_hash) == result
+
+
+def test_generate_report_releases_lease_on_error(generator, cache):
+    """A failed generation frees the lease for the next attempt."""
+    generator.model.generate.side_effect = RuntimeError("out of memory")
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(generator.generate_report(*INPUTS))
+    assert exc_info.value.status_code == 500
+    input_hash = generator.create_hash(*INPUTS)
+    assert cache.get(input_hash) is None
+    assert cache.acquire_lease(input_hash, "next-node")
+
+
+def test_load_results_returns_batch_hits(generator, cache):
+    """Bulk lookups return only the cached results."""
+    cache.set("a", {"report": "a"})
+    cache.set("b", {"report": "b"})
+    results = asyncio.run(generator.load_results(["a", "missing", "b"]))
+    assert results == {"a": {"report": "a"}, "b": {"report": "b"}}